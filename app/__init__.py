@@ -4,16 +4,28 @@ from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from config import Config
+from app.utils.metrics import Metrics
+from app.utils.maintenance import MaintenanceScheduler
+from app.utils.compression import Compress
+from app.utils.assets import Assets
+from app.utils.snapshot import RosterSnapshots
+from app.utils.templating import TemplateCache
 import logging
 
 db = SQLAlchemy()
 migrate = Migrate()
 login_manager = LoginManager()
 csrf = CSRFProtect()
+metrics = Metrics()
+maintenance = MaintenanceScheduler()
+compress = Compress()
+assets = Assets()
+roster_snapshots = RosterSnapshots()
+template_cache = TemplateCache()
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
 
     if not app.debug:
         app.logger.setLevel(logging.INFO)
@@ -22,6 +34,13 @@ def create_app():
     migrate.init_app(app, db)
     login_manager.init_app(app)
     csrf.init_app(app)
+    metrics.init_app(app)
+    # after_request hooks run in reverse order: assets sets the cache headers
+    # that compress uses to decide whether a response is cacheable.
+    compress.init_app(app)
+    assets.init_app(app)
+    roster_snapshots.init_app(app)
+    template_cache.init_app(app)
 
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -43,4 +62,10 @@ def create_app():
     from app.user import bp as user_bp
     app.register_blueprint(user_bp, url_prefix='/user')
 
+    maintenance.init_app(app)
+
+    if app.config.get('METRICS_ENABLED', True):
+        from app.monitoring import bp as monitoring_bp
+        app.register_blueprint(monitoring_bp)
+
     return app
\ No newline at end of file
@@ -1,9 +1,19 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SelectField, SubmitField
-from wtforms.validators import DataRequired, Email, Length, ValidationError
+from wtforms.validators import DataRequired, Email, Length, Optional, ValidationError
 from app.models.user import User, Role
 from flask_login import current_user
 
+def assignable_roles():
+    """Roles the current user may assign to other users"""
+    if current_user.is_admin():
+        return Role.query.all()
+    elif current_user.can_manage_user(User(role=Role(name='Manager'))):
+        return Role.query.filter(Role.name.in_(['Regular', 'Analyst', 'Manager'])).all()
+    elif current_user.can_manage_user(User(role=Role(name='Analyst'))):
+        return Role.query.filter(Role.name.in_(['Regular', 'Analyst'])).all()
+    return Role.query.filter_by(name='Regular').all()
+
 class UserCreateForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=4, max=25)])
     email = StringField('Email', validators=[DataRequired(), Email()])
@@ -21,16 +31,7 @@ class UserCreateForm(FlaskForm):
     
     def populate_roles(self):
         """Populate role choices based on current user permissions"""
-        if current_user.is_admin():
-            roles = Role.query.all()
-        elif current_user.can_manage_user(User(role=Role(name='Manager'))):
-            roles = Role.query.filter(Role.name.in_(['Regular', 'Analyst', 'Manager'])).all()
-        elif current_user.can_manage_user(User(role=Role(name='Analyst'))):
-            roles = Role.query.filter(Role.name.in_(['Regular', 'Analyst'])).all()
-        else:
-            roles = Role.query.filter_by(name='Regular').all()
-        
-        self.role.choices = [(role.id, role.name) for role in roles]
+        self.role.choices = [(role.id, role.name) for role in assignable_roles()]
     
     def validate_username(self, username):
         user = User.query.filter_by(username=username.data).first()
@@ -59,16 +60,7 @@ class UserEditForm(FlaskForm):
     
     def populate_roles(self):
         """Populate role choices based on current user permissions"""
-        if current_user.is_admin():
-            roles = Role.query.all()
-        elif current_user.can_manage_user(User(role=Role(name='Manager'))):
-            roles = Role.query.filter(Role.name.in_(['Regular', 'Analyst', 'Manager'])).all()
-        elif current_user.can_manage_user(User(role=Role(name='Analyst'))):
-            roles = Role.query.filter(Role.name.in_(['Regular', 'Analyst'])).all()
-        else:
-            roles = Role.query.filter_by(name='Regular').all()
-        
-        self.role.choices = [(role.id, role.name) for role in roles]
+        self.role.choices = [(role.id, role.name) for role in assignable_roles()]
     
     def validate_username(self, username):
         if username.data != self.user.username:
@@ -80,4 +72,25 @@ class UserEditForm(FlaskForm):
         if email.data != self.user.email:
             user = User.query.filter_by(email=email.data).first()
             if user:
-                raise ValidationError('Email already exists.')
\ No newline at end of file
+                raise ValidationError('Email already exists.')
+
+class BulkUserActionForm(FlaskForm):
+    action = SelectField('Action', choices=[
+        ('approve', 'Approve'),
+        ('deactivate', 'Deactivate'),
+        ('change_role', 'Change role')
+    ])
+    role = SelectField('Role', coerce=int, validators=[Optional()])
+    submit = SubmitField('Apply')
+    
+    def __init__(self, *args, **kwargs):
+        super(BulkUserActionForm, self).__init__(*args, **kwargs)
+        self.role.choices = [(role.id, role.name) for role in assignable_roles()]
+    
+    def validate(self, extra_validators=None):
+        if not super(BulkUserActionForm, self).validate(extra_validators):
+            return False
+        if self.action.data == 'change_role' and not self.role.data:
+            self.role.errors.append('Select the role to assign.')
+            return False
+        return True
\ No newline at end of file
@@ -2,17 +2,21 @@ from flask import render_template, redirect, url_for, flash, request, abort
 from flask_login import login_required, current_user
 from app import db
 from app.admin import bp
-from app.admin.forms import UserCreateForm, UserEditForm
+from app.admin.forms import UserCreateForm, UserEditForm, BulkUserActionForm
 from app.models.user import User, Role
 from app.utils.decorators import user_management_required
+from sqlalchemy import and_, case, func, or_
+from datetime import datetime, timezone
 
 @bp.route('/')
 @login_required
 @user_management_required
 def index():
-    total_users = User.query.count()
-    pending_users = User.query.filter_by(status='pending').count()
-    active_users = User.query.filter_by(status='approved', active=True).count()
+    total_users, pending_users, active_users = db.session.query(
+        func.count(User.id),
+        func.coalesce(func.sum(case((User.status == 'pending', 1), else_=0)), 0),
+        func.coalesce(func.sum(case((and_(User.status == 'approved', User.active.is_(True)), 1), else_=0)), 0)
+    ).one()
     recent_registrations = User.query.order_by(User.created_at.desc()).limit(5).all()
     
     return render_template('admin/index.html', 
@@ -27,9 +31,73 @@ def index():
 @user_management_required
 def users():
     page = request.args.get('page', 1, type=int)
-    users = User.query.order_by(User.created_at.desc()).paginate(
+    filters = {
+        'q': request.args.get('q', '').strip(),
+        'status': request.args.get('status', '').strip(),
+        'role': request.args.get('role', type=int),
+        'department': request.args.get('department', '').strip(),
+    }
+    users = search_users(**filters).order_by(User.created_at.desc()).paginate(
         page=page, per_page=20, error_out=False)
-    return render_template('admin/users.html', users=users)
+    return render_template('admin/users.html', users=users, filters=filters,
+                         roles=Role.query.order_by(Role.name).all(),
+                         bulk_form=BulkUserActionForm())
+
+def search_users(q='', status='', role=None, department=''):
+    query = User.query
+    if q:
+        # Prefix ranges on the lowered columns can use the expression indexes
+        prefix = q.lower()
+        upper = prefix + '\uffff'
+        query = query.filter(or_(*(
+            and_(func.lower(column) >= prefix, func.lower(column) < upper)
+            for column in (User.username, User.email, User.first_name, User.last_name)
+        )))
+    if status == 'inactive':
+        query = query.filter(User.active.is_(False))
+    elif status:
+        query = query.filter(User.status == status)
+    if role:
+        query = query.filter(User.role_id == role)
+    if department:
+        query = query.filter(User.department == department)
+    return query
+
+@bp.route('/users/bulk', methods=['POST'])
+@login_required
+@user_management_required
+def bulk_users():
+    form = BulkUserActionForm()
+    user_ids = request.form.getlist('user_ids', type=int)
+    if not form.validate_on_submit() or not user_ids:
+        flash('Select at least one user and a valid action.', 'warning')
+        return redirect(request.referrer or url_for('admin.users'))
+    
+    # A single UPDATE restricted to the users can_manage_user allows
+    targets = current_user.manageable_users().filter(User.id.in_(user_ids))
+    if form.action.data == 'approve':
+        updated = targets.filter(User.status == 'pending').update({
+            User.status: 'approved',
+            User.active: True,
+            User.approved_at: datetime.now(timezone.utc),
+            User.approved_by_id: current_user.id
+        }, synchronize_session=False)
+        message = f'{updated} users approved.'
+    elif form.action.data == 'deactivate':
+        updated = targets.filter(User.id != current_user.id).update(
+            {User.active: False}, synchronize_session=False)
+        message = f'{updated} users deactivated.'
+    else:
+        updated = targets.filter(User.id != current_user.id).update(
+            {User.role_id: form.role.data}, synchronize_session=False)
+        message = f'{updated} users moved to {dict(form.role.choices)[form.role.data]}.'
+    db.session.commit()
+    
+    flash(message, 'success')
+    skipped = len(set(user_ids)) - updated
+    if skipped:
+        flash(f'{skipped} selected users were skipped (not permitted or already in that state).', 'info')
+    return redirect(request.referrer or url_for('admin.users'))
 
 @bp.route('/user/create', methods=['GET', 'POST'])
 @login_required
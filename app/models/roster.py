@@ -1,9 +1,56 @@
 from app import db
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
+from functools import lru_cache
 import uuid
 from dateutil.relativedelta import relativedelta
 import re
+from sqlalchemy import case, event
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session
+from app.utils.birthplaces import birthplace_key, normalize_state, split_birthplace
+
+@lru_cache(maxsize=16384)
+def age_on(date_of_birth, on_date):
+    return relativedelta(on_date, date_of_birth).years
+
+# Team average ages only change at midnight or when a roster changes, so they
+# are precomputed once a day by the maintenance scheduler and when a worker
+# starts, and filled in on first read otherwise. Each process keeps its own
+# copy, so entries are versioned by the team's updated_at, which every player
+# write bumps in the database; a stale entry in any worker is simply
+# recomputed on its next read.
+_average_ages = {'date': None, 'values': {}}
+
+def refresh_average_ages():
+    today = date.today()
+    ages = {}
+    rows = db.session.query(Player.team_id, Player.date_of_birth).filter(
+        Player.date_of_birth.isnot(None))
+    for team_id, date_of_birth in rows:
+        ages.setdefault(team_id, []).append(age_on(date_of_birth, today))
+    values = {}
+    for team_id, updated_at in db.session.query(Team.id, Team.updated_at):
+        team_ages = ages.get(team_id)
+        values[team_id] = (updated_at, round(sum(team_ages) / len(team_ages), 1) if team_ages else None)
+    _average_ages['date'] = today
+    _average_ages['values'] = values
+    return values
+
+def cached_average_age(team_id, version):
+    """Return the ``(version, average)`` entry for the team if it is still current."""
+    if _average_ages['date'] != date.today():
+        return None
+    entry = _average_ages['values'].get(team_id)
+    if entry is None or entry[0] != version:
+        return None
+    return entry
+
+def remember_average_age(team_id, version, value):
+    today = date.today()
+    if _average_ages['date'] != today:
+        _average_ages['date'] = today
+        _average_ages['values'] = {}
+    _average_ages['values'][team_id] = (version, value)
 
 class Team(db.Model):
     __tablename__ = 'teams'
@@ -19,9 +66,9 @@ class Team(db.Model):
     home_stadium = db.Column(db.String(100))
     manager = db.Column(db.String(100))
     description = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
-    updated_at = db.Column(db.DateTime, default=datetime.now(timezone.utc), 
-                          onupdate=datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), 
+                          onupdate=lambda: datetime.now(timezone.utc))
     created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     
     created_by = db.relationship('User', backref='created_teams')
@@ -34,8 +81,116 @@ class Team(db.Model):
     
     @property
     def average_age(self):
+        cached = cached_average_age(self.id, self.updated_at)
+        if cached is not None:
+            return cached[1]
         ages = [p.age for p in self.players if p.age]
-        return round(sum(ages) / len(ages), 1) if ages else None
+        value = round(sum(ages) / len(ages), 1) if ages else None
+        remember_average_age(self.id, self.updated_at, value)
+        return value
+    
+    def transfer_players(self, player_ids, target, jersey_policy='keep'):
+        """Move the given players of this team to ``target`` in one UPDATE.
+
+        Jersey numbers already worn on ``target`` are resolved in a single
+        pass: 'keep' refuses the transfer, 'clear' drops the number and
+        'next_free' assigns the lowest unused one. Depth order is reset.
+        Returns the number of players moved and a ``{player_id: number}`` dict
+        of the numbers that changed. The caller commits.
+        """
+        moving = db.session.query(Player.id, Player.name, Player.jersey_number).filter(
+            Player.team_id == self.id, Player.id.in_(player_ids)).all()
+        if not moving:
+            return 0, {}
+        taken = {number for number, in db.session.query(Player.jersey_number).filter(
+            Player.team_id == target.id, Player.jersey_number.isnot(None))}
+        conflicts = [player for player in moving
+                     if player.jersey_number is not None and player.jersey_number in taken]
+        
+        if conflicts and jersey_policy == 'keep':
+            raise ValueError('Jersey numbers already taken on {}: {}'.format(
+                target.name, ', '.join(f'#{player.jersey_number} {player.name}' for player in conflicts)))
+        if jersey_policy == 'next_free':
+            taken.update(player.jersey_number for player in moving if player.jersey_number is not None)
+            free = (number for number in range(1, 100) if number not in taken)
+            numbers = {player.id: next(free, None) for player in conflicts}
+        else:
+            numbers = {player.id: None for player in conflicts}
+        
+        now = datetime.now(timezone.utc)
+        values = {Player.team_id: target.id, Player.depth_order: 1, Player.updated_at: now}
+        if numbers:
+            values[Player.jersey_number] = case(numbers, value=Player.id, else_=Player.jersey_number)
+        Player.query.filter(Player.id.in_([player.id for player in moving])).update(
+            values, synchronize_session=False)
+        
+        # The bulk UPDATE skips the per-player flush tracking, so both teams
+        # are touched once here: the new updated_at retires their cached
+        # average ages and fragments in every worker and marks the roster
+        # snapshot as changed.
+        self.updated_at = target.updated_at = now
+        return len(moving), numbers
+
+class Birthplace(db.Model):
+    __tablename__ = 'birthplaces'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    city = db.Column(db.String(50))
+    state = db.Column(db.String(50))
+    city_key = db.Column(db.String(50), nullable=False, default='')
+    state_key = db.Column(db.String(50), nullable=False, default='', index=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('city_key', 'state_key', name='unique_birthplace'),
+    )
+    
+    @property
+    def display(self):
+        return ' - '.join(part for part in (self.city, self.state) if part)
+
+# Birthplaces are a small, append-only dimension, so each process keeps the
+# key -> id map of committed rows. Rows created by a session are kept in its
+# info and only join the map once that session commits.
+_birthplace_ids = {'loaded': False, 'ids': {}}
+
+def resolve_birthplace(city, state):
+    """Return the Birthplace id for ``city``/``state``, or a new pending Birthplace."""
+    key = birthplace_key(city, state)
+    if key is None:
+        return None
+    ids = _birthplace_ids['ids']
+    with db.session.no_autoflush:
+        if not _birthplace_ids['loaded']:
+            ids.update(((city_key, state_key), birthplace_id) for birthplace_id, city_key, state_key
+                       in db.session.query(Birthplace.id, Birthplace.city_key, Birthplace.state_key))
+            _birthplace_ids['loaded'] = True
+        if key in ids:
+            return ids[key]
+        pending = db.session.info.setdefault('new_birthplaces', {})
+        if key in pending:
+            return pending[key]
+        # Another process may have created it since the map was loaded
+        birthplace_id = db.session.query(Birthplace.id).filter_by(
+            city_key=key[0], state_key=key[1]).scalar()
+    if birthplace_id is not None:
+        ids[key] = birthplace_id
+        return birthplace_id
+    birthplace = Birthplace(city=city.strip() if city else None, state=normalize_state(state)[1],
+                            city_key=key[0], state_key=key[1])
+    db.session.add(birthplace)
+    pending[key] = birthplace
+    return birthplace
+
+@event.listens_for(Session, 'after_commit')
+def _remember_new_birthplaces(session):
+    for key, birthplace in session.info.pop('new_birthplaces', {}).items():
+        identity = db.inspect(birthplace).identity
+        if identity is not None:
+            _birthplace_ids['ids'][key] = identity[0]
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_new_birthplaces(session):
+    session.info.pop('new_birthplaces', None)
 
 class Player(db.Model):
     __tablename__ = 'players'
@@ -63,13 +218,16 @@ class Player(db.Model):
     field_y = db.Column(db.Float, default=0.0)
     depth_order = db.Column(db.Integer, default=1)
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
-    updated_at = db.Column(db.DateTime, default=datetime.now(timezone.utc), 
-                          onupdate=datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), 
+                          onupdate=lambda: datetime.now(timezone.utc))
     team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
     created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    birthplace_id = db.Column(db.Integer, db.ForeignKey('birthplaces.id', name='fk_players_birthplace_id'),
+                              index=True)
     
     created_by = db.relationship('User', backref='created_players')
+    birthplace = db.relationship('Birthplace', backref=db.backref('players', lazy='dynamic'))
     
     __table_args__ = (
         db.UniqueConstraint('team_id', 'jersey_number', name='unique_jersey_per_team'),
@@ -96,8 +254,7 @@ class Player(db.Model):
     def age(self):
         if not self.date_of_birth:
             return None
-        today = datetime.now().date()
-        return relativedelta(today, self.date_of_birth).years
+        return age_on(self.date_of_birth, date.today())
     
     @property
     def birthplace_display(self):
@@ -124,23 +281,46 @@ class Player(db.Model):
             return self.general_position.title()
         return 'Unknown'
     
-    def set_date_of_birth_from_string(self, dob_string, format='%d/%m/%Y'):
-        try:
-            self.date_of_birth = datetime.strptime(dob_string, format).date()
-        except ValueError:
+    @staticmethod
+    def parse_date_of_birth(dob_string, format='%d/%m/%Y'):
+        for date_format in (format, '%m/%d/%Y', '%Y-%m-%d'):
             try:
-                self.date_of_birth = datetime.strptime(dob_string, '%m/%d/%Y').date()
+                return datetime.strptime(dob_string, date_format).date()
             except ValueError:
-                try:
-                    self.date_of_birth = datetime.strptime(dob_string, '%Y-%m-%d').date()
-                except ValueError:
-                    pass
+                continue
+        return None
+    
+    def set_date_of_birth_from_string(self, dob_string, format='%d/%m/%Y'):
+        date_of_birth = self.parse_date_of_birth(dob_string, format)
+        if date_of_birth is not None:
+            self.date_of_birth = date_of_birth
+    
+    def set_birthplace(self, city, state):
+        birthplace = resolve_birthplace(city, state)
+        if isinstance(birthplace, Birthplace):
+            self.birthplace = birthplace
+        else:
+            self.birthplace_id = birthplace
     
     def set_birthplace_from_string(self, birthplace_string):
         self.birthplace_full = birthplace_string
-        if ' - ' in birthplace_string:
-            parts = birthplace_string.split(' - ', 1)
-            self.birthplace_city = parts[0].strip()
-            self.birthplace_state = parts[1].strip()
-        else:
-            self.birthplace_city = birthplace_string.strip()
\ No newline at end of file
+        city, state = split_birthplace(birthplace_string)
+        self.birthplace_city = city
+        if state:
+            self.birthplace_state = state
+        self.set_birthplace(city, state)
+
+@event.listens_for(Session, 'after_flush')
+def _touch_player_teams(session, flush_context):
+    # One UPDATE per flush bumps updated_at on every team whose roster
+    # changed, including the team a moved player left.
+    team_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(obj, Player) or (obj in session.dirty and not session.is_modified(obj)):
+            continue
+        team_ids.add(obj.team_id)
+        team_ids.update(db.inspect(obj).attrs.team_id.history.deleted or ())
+    team_ids.discard(None)
+    if team_ids:
+        session.connection().execute(Team.__table__.update().where(
+            Team.__table__.c.id.in_(team_ids)).values(updated_at=datetime.now(timezone.utc)))
\ No newline at end of file
@@ -3,6 +3,7 @@ from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timezone
 from app.models.permissions import Permission
+from sqlalchemy import func
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -77,13 +78,29 @@ class User(UserMixin, db.Model):
     confirmed = db.Column(db.Boolean, default=False)
     status = db.Column(db.String(20), default='approved')
     active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     approved_at = db.Column(db.DateTime)
     role_id = db.Column(db.Integer, db.ForeignKey('roles.id'))
     approved_by_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     
     approved_by = db.relationship('User', remote_side=[id])
     
+    # The user list is always newest first, so each filter gets a composite
+    # index ending in created_at that serves both the lookup and the order.
+    # Search matches case-insensitive prefixes, which SQLite can only serve
+    # from indexes on the lowered expressions.
+    __table_args__ = (
+        db.Index('ix_users_status_active', 'status', 'active'),
+        db.Index('ix_users_status_created_at', 'status', 'created_at'),
+        db.Index('ix_users_active_created_at', 'active', 'created_at'),
+        db.Index('ix_users_role_id_created_at', 'role_id', 'created_at'),
+        db.Index('ix_users_department_created_at', 'department', 'created_at'),
+        db.Index('ix_users_username_lower', func.lower(username)),
+        db.Index('ix_users_email_lower', func.lower(email)),
+        db.Index('ix_users_first_name_lower', func.lower(first_name)),
+        db.Index('ix_users_last_name_lower', func.lower(last_name)),
+    )
+    
     def __init__(self, **kwargs):
         super(User, self).__init__(**kwargs)
         if self.role is None:
@@ -108,21 +125,37 @@ class User(UserMixin, db.Model):
     def is_admin(self):
         return self.can(Permission.ADMIN)
     
-    def can_manage_user(self, user):
-        """Check if current user can manage target user"""
+    def manageable_role_names(self):
+        """Role names this user may manage, or None for every role"""
         if not self.can(Permission.MANAGE_USERS):
-            return False
+            return []
         
         # Admin can manage everyone
         if self.is_admin():
-            return True
+            return None
         
         # Manager can manage Analysts and Regular users
         if self.can(Permission.MANAGE_MANAGERS):
-            return user.role.name in ['Regular', 'Analyst', 'Manager']
+            return ['Regular', 'Analyst', 'Manager']
         
         # Analyst can manage Regular users only
         if self.can(Permission.MANAGE_ANALYSTS):
-            return user.role.name == 'Regular'
+            return ['Regular']
         
-        return False
\ No newline at end of file
+        return []
+    
+    def can_manage_user(self, user):
+        """Check if current user can manage target user"""
+        role_names = self.manageable_role_names()
+        if role_names is None:
+            return True
+        return user.role is not None and user.role.name in role_names
+    
+    def manageable_users(self):
+        """Query of the users that can_manage_user would allow"""
+        role_names = self.manageable_role_names()
+        query = User.query
+        if role_names is not None:
+            query = query.filter(User.role_id.in_(
+                db.session.query(Role.id).filter(Role.name.in_(role_names))))
+        return query
\ No newline at end of file
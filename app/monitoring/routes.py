@@ -0,0 +1,9 @@
+from flask import Response
+from app import metrics
+from app.monitoring import bp
+
+CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+@bp.route('/metrics')
+def index():
+    return Response(metrics.generate_latest(), content_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
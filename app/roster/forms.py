@@ -2,7 +2,7 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import StringField, IntegerField, SelectField, TextAreaField, SubmitField, DecimalField, DateField
 from wtforms.validators import DataRequired, Length, Optional, NumberRange, ValidationError
-from app.models.roster import Player
+from app.models.roster import Team, Player
 
 class TeamForm(FlaskForm):
     name = StringField('Team Name', validators=[DataRequired(), Length(min=2, max=100)])
@@ -57,6 +57,20 @@ class PlayerForm(FlaskForm):
     notes = TextAreaField('Notes', validators=[Optional(), Length(max=1000)])
     submit = SubmitField('Save Player')
 
+class PlayerTransferForm(FlaskForm):
+    target_team = SelectField('Destination Team', coerce=int, validators=[DataRequired()])
+    jersey_policy = SelectField('Jersey Number Conflicts', default='next_free', choices=[
+        ('next_free', 'Assign the next free number'),
+        ('clear', 'Clear the conflicting numbers'),
+        ('keep', 'Keep numbers (cancel the transfer on conflict)')
+    ])
+    submit = SubmitField('Transfer Players')
+    
+    def __init__(self, source_team, *args, **kwargs):
+        super(PlayerTransferForm, self).__init__(*args, **kwargs)
+        self.target_team.choices = [(team.id, team.name) for team in
+                                    Team.query.filter(Team.id != source_team.id).order_by(Team.name)]
+
 class CSVImportForm(FlaskForm):
     csv_file = FileField('CSV File', validators=[FileRequired(), FileAllowed(['csv'], 'CSV files only!')])
     submit = SubmitField('Import Players')
\ No newline at end of file
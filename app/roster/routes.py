@@ -1,21 +1,31 @@
 from flask import render_template, redirect, url_for, flash, request, jsonify, current_app, session
 from flask_login import login_required, current_user
-from app import db
+from app import db, roster_snapshots
 from app.roster import bp
-from app.roster.forms import TeamForm, PlayerForm, CSVImportForm
-from app.models.roster import Team, Player
+from app.roster.forms import TeamForm, PlayerForm, PlayerTransferForm, CSVImportForm
+from app.models.roster import Team, Player, Birthplace
 from app.utils.decorators import admin_required
+from app.utils.metrics import ROSTER_IMPORT_ROWS, ROSTER_IMPORT_DURATION
+from app.utils.duplicates import build_player_index, make_key
+from sqlalchemy import func
 import csv
 import io
-from datetime import datetime
+import time
+from datetime import date, datetime
 
 @bp.route('/')
 @login_required
 def index():
-    teams = Team.query.order_by(Team.name).all()
+    snapshot = roster_snapshots.current()
+    if snapshot is not None:
+        teams = snapshot.teams()
+        total_players = snapshot.player_count
+        recent_players = snapshot.recent_players(5)
+    else:
+        teams = Team.query.order_by(Team.name).all()
+        total_players = Player.query.count()
+        recent_players = Player.query.order_by(Player.created_at.desc()).limit(5).all()
     total_teams = len(teams)
-    total_players = Player.query.count()
-    recent_players = Player.query.order_by(Player.created_at.desc()).limit(5).all()
     
     return render_template('roster/index.html',
                          teams=teams,
@@ -34,7 +44,10 @@ def teams():
 @bp.route('/team/<int:team_id>')
 @login_required
 def team_detail(team_id):
-    team = Team.query.get_or_404(team_id)
+    snapshot = roster_snapshots.current()
+    team = snapshot.team(team_id) if snapshot is not None else None
+    if team is None:
+        team = Team.query.get_or_404(team_id)
     positions = {}
     for player in team.players:
         pos = player.general_position or 'Unknown'
@@ -54,7 +67,41 @@ def team_detail(team_id):
     
     return render_template('roster/team_detail.html',
                          team=team,
-                         ordered_positions=ordered_positions)
+                         ordered_positions=ordered_positions,
+                         today=date.today())
+
+@bp.route('/duplicates')
+@login_required
+@admin_required
+def duplicates():
+    clusters = build_player_index().clusters()
+    team_names = dict(db.session.query(Team.id, Team.name))
+    return render_template('roster/duplicates.html',
+                         title='Possible Duplicate Players',
+                         clusters=clusters,
+                         team_names=team_names)
+
+@bp.route('/birthplaces')
+@login_required
+def birthplaces():
+    # An integer group-by over the birthplace_id index; the dimension rows
+    # are few enough to roll up by state in Python.
+    counts = dict(db.session.query(Player.birthplace_id, func.count(Player.id))
+                  .group_by(Player.birthplace_id))
+    unknown = counts.pop(None, 0)
+    states = {}
+    for birthplace in Birthplace.query.filter(Birthplace.id.in_(counts)):
+        state = states.setdefault(birthplace.state_key, {
+            'name': birthplace.state or 'Unknown state', 'players': 0, 'cities': []})
+        state['players'] += counts[birthplace.id]
+        state['cities'].append((birthplace, counts[birthplace.id]))
+    regions = sorted(states.values(), key=lambda state: state['players'], reverse=True)
+    for state in regions:
+        state['cities'].sort(key=lambda city: city[1], reverse=True)
+    return render_template('roster/birthplaces.html',
+                         title='Players by Region',
+                         regions=regions,
+                         unknown=unknown)
 
 @bp.route('/team/create', methods=['GET', 'POST'])
 @login_required
@@ -116,6 +163,7 @@ def add_player(team_id):
                 player.birthplace_full = form.birthplace_city.data or form.birthplace_state.data
             player.birthplace_city = form.birthplace_city.data
             player.birthplace_state = form.birthplace_state.data
+            player.set_birthplace(form.birthplace_city.data, form.birthplace_state.data)
         
         db.session.add(player)
         db.session.commit()
@@ -125,6 +173,40 @@ def add_player(team_id):
     return render_template('roster/player_form.html',
                          form=form, team=team, title=f'Add Player to {team.name}')
 
+@bp.route('/team/<int:team_id>/transfer', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def transfer_players(team_id):
+    team = Team.query.get_or_404(team_id)
+    form = PlayerTransferForm(team)
+    
+    if form.validate_on_submit():
+        player_ids = request.form.getlist('player_ids', type=int)
+        target = db.session.get(Team, form.target_team.data)
+        if not player_ids:
+            flash('Select at least one player to transfer.', 'warning')
+        else:
+            try:
+                moved, numbers = team.transfer_players(player_ids, target, form.jersey_policy.data)
+            except ValueError as e:
+                db.session.rollback()
+                flash(str(e), 'danger')
+            else:
+                db.session.commit()
+                flash(f'{moved} players transferred from {team.name} to {target.name}.', 'success')
+                reassigned = sum(1 for number in numbers.values() if number is not None)
+                cleared = len(numbers) - reassigned
+                if reassigned:
+                    flash(f'{reassigned} conflicting jersey numbers were reassigned.', 'info')
+                if cleared:
+                    flash(f'{cleared} conflicting jersey numbers were cleared.', 'info')
+                return redirect(url_for('roster.team_detail', team_id=target.id))
+    
+    players = team.players.order_by(Player.jersey_number).all()
+    return render_template('roster/transfer_players.html',
+                         form=form, team=team, players=players,
+                         title=f'Transfer Players from {team.name}')
+
 @bp.route('/team/<int:team_id>/import_players', methods=['GET', 'POST'])
 @login_required
 def import_players(team_id):
@@ -133,6 +215,7 @@ def import_players(team_id):
     
     if form.validate_on_submit():
         file = form.csv_file.data
+        started = time.perf_counter()
         
         try:
             stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
@@ -140,6 +223,8 @@ def import_players(team_id):
             
             imported_count = 0
             errors = []
+            possible_duplicates = []
+            duplicate_index = build_player_index()
             
             for row_num, row in enumerate(csv_reader, start=2):
                 try:
@@ -148,14 +233,23 @@ def import_players(team_id):
                         errors.append(f"Row {row_num}: Player name is required")
                         continue
                     
-                    existing_player = Player.query.filter_by(
-                        name=name, team_id=team_id
-                    ).first()
-                    
-                    if existing_player:
+                    birthplace = row.get('Birthplace', '').strip()
+                    dob_str = row.get('DOB', '').strip()
+                    key = make_key(None, name,
+                                   date_of_birth=Player.parse_date_of_birth(dob_str) if dob_str else None,
+                                   birthplace_full=birthplace or None,
+                                   team_id=team_id)
+                    if duplicate_index.same_team_duplicate(key):
                         errors.append(f"Row {row_num}: Player '{name}' already exists in this team")
                         continue
                     
+                    matches = duplicate_index.matches(key)
+                    if matches:
+                        match = matches[0]
+                        possible_duplicates.append(
+                            f"Row {row_num}: '{name}' may duplicate '{match.player.name}' "
+                            f"({', '.join(match.reasons)})")
+                    
                     player = Player(
                         name=name,
                         general_position=row.get('General Position', '').strip() or None,
@@ -168,11 +262,9 @@ def import_players(team_id):
                         created_by=current_user
                     )
                     
-                    birthplace = row.get('Birthplace', '').strip()
                     if birthplace:
                         player.set_birthplace_from_string(birthplace)
                     
-                    dob_str = row.get('DOB', '').strip()
                     if dob_str:
                         try:
                             player.set_date_of_birth_from_string(dob_str)
@@ -181,6 +273,7 @@ def import_players(team_id):
                             continue
                     
                     db.session.add(player)
+                    duplicate_index.add(key)
                     imported_count += 1
                     
                 except Exception as e:
@@ -188,12 +281,21 @@ def import_players(team_id):
             
             if imported_count > 0:
                 db.session.commit()
+            ROSTER_IMPORT_ROWS.inc(imported_count, result='imported')
+            ROSTER_IMPORT_ROWS.inc(len(errors), result='rejected')
+            ROSTER_IMPORT_DURATION.observe(time.perf_counter() - started)
+            
+            if imported_count > 0:
                 flash(f'Successfully imported {imported_count} players to {team.name}!', 'success')
             
             for error in errors[:10]:
                 flash(error, 'warning')
             if len(errors) > 10:
                 flash(f'... and {len(errors) - 10} more errors', 'warning')
+            for warning in possible_duplicates[:10]:
+                flash(warning, 'info')
+            if len(possible_duplicates) > 10:
+                flash(f'... and {len(possible_duplicates) - 10} more possible duplicates', 'info')
             
             if imported_count > 0:
                 return redirect(url_for('roster.team_detail', team_id=team_id))
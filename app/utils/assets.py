@@ -0,0 +1,62 @@
+import hashlib
+import os
+
+from flask import request
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class Assets:
+    """Content-hash fingerprinting for files under the static folder.
+
+    ``url_for('static', filename=...)`` gets a ``v=<hash>`` argument added
+    automatically. Requests that carry the current hash are served with a
+    one-year immutable ``Cache-Control``, so browsers only revalidate after
+    the file content (and therefore its URL) changes.
+    """
+
+    def __init__(self, app=None):
+        self._hashes = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        app.url_defaults(self.inject_fingerprint)
+        app.after_request(self.set_cache_headers)
+
+    def fingerprint(self, filename):
+        path = os.path.join(self.static_folder, filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._hashes.get(filename)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        fingerprint = digest.hexdigest()[:12]
+        self._hashes[filename] = (mtime, fingerprint)
+        return fingerprint
+
+    def inject_fingerprint(self, endpoint, values):
+        if endpoint != 'static' or 'v' in values or not values.get('filename'):
+            return
+        fingerprint = self.fingerprint(values['filename'])
+        if fingerprint:
+            values['v'] = fingerprint
+
+    def set_cache_headers(self, response):
+        if request.endpoint != 'static' or response.status_code not in (200, 304):
+            return response
+        version = request.args.get('v')
+        filename = (request.view_args or {}).get('filename')
+        if version and filename and version == self.fingerprint(filename):
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
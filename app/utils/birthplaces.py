@@ -0,0 +1,50 @@
+from app.utils.duplicates import normalize_name
+
+# Venezuelan states by normalized name and common alternative spellings.
+# Their abbreviations are recognized too, so "Zulia", "zulia" and "ZUL" all
+# resolve to the same state key.
+STATE_CODES = {
+    'amazonas': 'AMA', 'anzoategui': 'ANZ', 'apure': 'APU', 'aragua': 'ARA',
+    'barinas': 'BAR', 'bolivar': 'BOL', 'carabobo': 'CAR', 'cojedes': 'COJ',
+    'delta amacuro': 'DAM', 'distrito capital': 'DCA', 'distrito federal': 'DCA',
+    'falcon': 'FAL', 'guarico': 'GUA', 'la guaira': 'LAG', 'vargas': 'LAG',
+    'lara': 'LAR', 'merida': 'MER', 'miranda': 'MIR', 'monagas': 'MON',
+    'nueva esparta': 'NES', 'portuguesa': 'POR', 'sucre': 'SUC', 'tachira': 'TAC',
+    'trujillo': 'TRU', 'yaracuy': 'YAR', 'zulia': 'ZUL',
+}
+STATE_CODES.update({code.lower(): code for code in set(STATE_CODES.values())})
+STATE_CODES.update({'dc': 'DCA', 'df': 'DCA', 'var': 'LAG'})
+
+
+def split_birthplace(birthplace_string):
+    """Split ``"City - STATE"`` free text into ``(city, state)``."""
+    if not birthplace_string or not birthplace_string.strip():
+        return None, None
+    if ' - ' in birthplace_string:
+        city, state = birthplace_string.split(' - ', 1)
+        return city.strip() or None, state.strip() or None
+    return birthplace_string.strip(), None
+
+
+def normalize_state(state):
+    """Return ``(key, display)`` for a state name or abbreviation."""
+    key = normalize_name(state)
+    if not key:
+        return '', None
+    code = STATE_CODES.get(key)
+    if code:
+        return code, code
+    return key, state.strip()
+
+
+def birthplace_key(city, state):
+    """Deduplication key ``(city_key, state_key)``, or None when both are empty.
+
+    Missing parts are stored as empty strings rather than NULL so the unique
+    constraint on the key also covers city-only and state-only birthplaces.
+    """
+    city_key = normalize_name(city)
+    state_key, _ = normalize_state(state)
+    if not city_key and not state_key:
+        return None
+    return city_key, state_key
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    'text/html', 'text/css', 'text/csv', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json',
+)
+
+
+class Compress:
+    """Compresses eligible responses with brotli (when installed) or gzip.
+
+    Compressed bytes are kept in a small LRU so repeat hits skip the
+    compressor. Fingerprinted static files are keyed by their ``v`` hash and
+    looked up before the file is read; every other response is keyed by a
+    digest of its body, which is also sent as the ETag so unchanged pages
+    can be answered with a 304.
+    """
+
+    def __init__(self, app=None):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+        self.level = app.config.get('COMPRESS_LEVEL', 6)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', 5)
+        self.mimetypes = set(app.config.get('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES))
+        self.cache_size = app.config.get('COMPRESS_CACHE_SIZE', 256)
+        if app.config.get('COMPRESS_ENABLED', True):
+            app.after_request(self.after_request)
+
+    def choose_encoding(self):
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def after_request(self, response):
+        # send_file responses are streamed from the file; only static files
+        # are worth reading into memory to compress.
+        if (response.status_code != 200
+                or response.mimetype not in self.mimetypes
+                or (response.is_streamed and request.endpoint != 'static')
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.choose_encoding()
+        if encoding is None:
+            return response
+
+        key = _static_key(response, encoding)
+        compressed = self._cache_get(key) if key else None
+        if compressed is not None:
+            response.response.close()
+        else:
+            response.direct_passthrough = False
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            if key is None:
+                response.add_etag()
+                response.make_conditional(request)
+                if response.status_code == 304:
+                    return response
+                key = (encoding, response.get_etag()[0])
+                compressed = self._cache_get(key)
+            if compressed is None:
+                compressed = self.compress(data, encoding)
+                self._cache_put(key, compressed)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _cache_get(self, key):
+        with self._lock:
+            value = self._cache.get(key)
+            if value is not None:
+                self._cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+def _is_cacheable(response):
+    cache_control = response.cache_control
+    if cache_control.no_store or cache_control.private or cache_control.no_cache:
+        return False
+    return bool(cache_control.public or cache_control.max_age)
+
+
+def _static_key(response, encoding):
+    # Assets only marks a static response cacheable when its ``v`` argument
+    # matches the file's content hash, so the hash identifies the bytes.
+    version = request.args.get('v')
+    if request.endpoint != 'static' or not version or not _is_cacheable(response):
+        return None
+    return (encoding, 'static', request.view_args['filename'], version)
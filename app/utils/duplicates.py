@@ -0,0 +1,173 @@
+import re
+import unicodedata
+from collections import namedtuple
+
+from flask import current_app
+
+PlayerKey = namedtuple('PlayerKey', 'id name normalized grams date_of_birth birthplace team_id')
+Match = namedtuple('Match', 'player score similarity reasons')
+
+
+def normalize_name(name):
+    """Lowercase, strip accents and punctuation and drop single-letter initials."""
+    if not name:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', name)
+    ascii_name = ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    tokens = re.sub(r'[^a-z0-9\s]', ' ', ascii_name).split()
+    return ' '.join(token for token in tokens if len(token) > 1 or token.isdigit())
+
+
+def trigrams(normalized):
+    padded = f'  {normalized} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def normalize_birthplace(birthplace_city, birthplace_full=None):
+    value = birthplace_city or birthplace_full
+    if not value:
+        return None
+    return normalize_name(value.split(' - ', 1)[0]) or None
+
+
+def make_key(player_id, name, date_of_birth=None, birthplace_city=None,
+             birthplace_full=None, team_id=None):
+    normalized = normalize_name(name)
+    return PlayerKey(player_id, name, normalized, trigrams(normalized), date_of_birth,
+                     normalize_birthplace(birthplace_city, birthplace_full), team_id)
+
+
+class TrigramIndex:
+    """Inverted trigram index over normalized player names.
+
+    Candidates are found by counting shared trigrams through the posting
+    lists, so a lookup touches only players that share part of the name
+    instead of the whole table. Trigrams whose posting list grows beyond
+    ``max_postings`` are treated as stop-grams: they are not used to find
+    candidates, but still count when a candidate is scored.
+    """
+
+    def __init__(self, threshold=0.75, max_postings=500):
+        self.threshold = threshold
+        self.max_postings = max_postings
+        self._players = []
+        self._postings = {}
+        self._by_team_name = {}
+
+    def __len__(self):
+        return len(self._players)
+
+    def add(self, key):
+        position = len(self._players)
+        self._players.append(key)
+        self._by_team_name.setdefault((key.team_id, key.name), []).append(key)
+        for gram in key.grams:
+            self._postings.setdefault(gram, []).append(position)
+        return position
+
+    def same_team_duplicate(self, key):
+        """Existing player with exactly the same name on the same team.
+
+        A known, different date of birth means a namesake rather than the
+        same player, so that pair is not reported.
+        """
+        for other in self._by_team_name.get((key.team_id, key.name), ()):
+            if not (key.date_of_birth and other.date_of_birth
+                    and key.date_of_birth != other.date_of_birth):
+                return other
+        return None
+
+    def candidates(self, key):
+        found = set()
+        for gram in key.grams:
+            postings = self._postings.get(gram)
+            if postings is None or len(postings) > self.max_postings:
+                continue
+            found.update(postings)
+        return found
+
+    def matches(self, key, exclude_id=None):
+        results = []
+        for position in self.candidates(key):
+            other = self._players[position]
+            if exclude_id is not None and other.id == exclude_id:
+                continue
+            match = score_pair(key, other, self.threshold)
+            if match is not None:
+                results.append(match)
+        results.sort(key=lambda match: match.score, reverse=True)
+        return results
+
+    def clusters(self):
+        parent = list(range(len(self._players)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        scores = {}
+        for position, key in enumerate(self._players):
+            for other in self.candidates(key):
+                if other <= position:
+                    continue
+                match = score_pair(key, self._players[other], self.threshold)
+                if match is None:
+                    continue
+                a, b = find(position), find(other)
+                if a != b:
+                    parent[b] = a
+                scores[(position, other)] = match
+
+        pairs_by_root = {}
+        for (a, b), match in scores.items():
+            pairs_by_root.setdefault(find(a), []).append((self._players[a], self._players[b], match))
+        members_by_root = {}
+        for position in range(len(self._players)):
+            root = find(position)
+            if root in pairs_by_root:
+                members_by_root.setdefault(root, []).append(self._players[position])
+        result = [(members_by_root[root], pairs) for root, pairs in pairs_by_root.items()]
+        result.sort(key=lambda cluster: max(match.score for _, _, match in cluster[1]), reverse=True)
+        return result
+
+
+def score_pair(a, b, threshold):
+    """Return a Match for ``b`` when it is a likely duplicate of ``a``.
+
+    Name similarity is the Dice coefficient of the two trigram sets. A
+    known, different date of birth rules a pair out; a matching date of
+    birth or birthplace raises the score.
+    """
+    if not a.grams or not b.grams:
+        return None
+    similarity = 2.0 * len(a.grams & b.grams) / (len(a.grams) + len(b.grams))
+    if similarity < threshold:
+        return None
+    if a.date_of_birth and b.date_of_birth and a.date_of_birth != b.date_of_birth:
+        return None
+
+    reasons = ['same name' if a.normalized == b.normalized else f'similar name ({similarity:.0%})']
+    score = similarity
+    if a.date_of_birth and a.date_of_birth == b.date_of_birth:
+        score += 0.2
+        reasons.append('same date of birth')
+    if a.birthplace and a.birthplace == b.birthplace:
+        score += 0.1
+        reasons.append('same birthplace')
+    if a.team_id is not None and a.team_id != b.team_id:
+        reasons.append('different team')
+    return Match(b, round(score, 3), similarity, reasons)
+
+
+def build_player_index():
+    from app import db
+    from app.models.roster import Player
+    index = TrigramIndex(threshold=current_app.config.get('DUPLICATE_NAME_THRESHOLD', 0.75),
+                         max_postings=current_app.config.get('DUPLICATE_MAX_POSTINGS', 500))
+    rows = db.session.query(Player.id, Player.name, Player.date_of_birth, Player.birthplace_city,
+                            Player.birthplace_full, Player.team_id)
+    for row in rows:
+        index.add(make_key(*row))
+    return index
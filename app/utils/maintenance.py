@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_login import login_user
+from sqlalchemy import func
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def optimize_database():
+    from app import db
+    engine = db.engine
+    with engine.connect() as conn:
+        if engine.dialect.name == 'sqlite':
+            conn.exec_driver_sql('ANALYZE')
+            conn.exec_driver_sql('PRAGMA optimize')
+            # incremental_vacuum only works on files in auto_vacuum=INCREMENTAL
+            # mode, and switching an existing file takes a full VACUUM, so that
+            # is done once here, off-peak. The sqlite3 module only steps a
+            # plain execute() once, which frees a single page, so the pragmas
+            # go through executescript() to run to completion.
+            driver_connection = conn.connection.driver_connection
+            if conn.exec_driver_sql('PRAGMA auto_vacuum').scalar() == 0:
+                current_app.logger.info('Converting the database to incremental auto-vacuum')
+                driver_connection.executescript('PRAGMA auto_vacuum = INCREMENTAL; VACUUM;')
+            else:
+                driver_connection.executescript('PRAGMA incremental_vacuum;')
+        else:
+            conn.exec_driver_sql('ANALYZE')
+        conn.commit()
+
+
+def refresh_daily_stats():
+    from app.models.roster import age_on, refresh_average_ages
+    age_on.cache_clear()
+    values = refresh_average_ages()
+    current_app.logger.info(f'Refreshed average ages for {len(values)} teams')
+
+
+def warm_roster_pages():
+    from app import db
+    from app.models.roster import Team, Player
+    from app.models.user import User, Role
+    from app.models.permissions import Permission
+
+    user = User.query.join(Role).filter(
+        User.active.is_(True),
+        Role.permissions.op('&')(Permission.VIEW_BASIC_STATS) != 0
+    ).order_by(Role.permissions.desc()).first()
+    if user is None:
+        current_app.logger.info('Skipping page warm-up: no active user to render as')
+        return
+
+    limit = current_app.config.get('MAINTENANCE_WARM_TEAMS', 10)
+    team_ids = [team_id for team_id, in db.session.query(Team.id)
+                .outerjoin(Player)
+                .group_by(Team.id)
+                .order_by(func.count(Player.id).desc())
+                .limit(limit)]
+    paths = ['/roster/', '/roster/teams'] + [f'/roster/team/{team_id}' for team_id in team_ids]
+
+    app = current_app._get_current_object()
+    for path in paths:
+        with app.test_request_context(path):
+            login_user(user)
+            app.preprocess_request()
+            response = app.make_response(app.dispatch_request())
+            app.process_response(response)
+    db.session.remove()
+
+
+TASKS = {
+    'optimize': optimize_database,
+    'stats': refresh_daily_stats,
+    'warm': warm_roster_pages,
+}
+
+
+def run_task(name):
+    start = time.perf_counter()
+    try:
+        TASKS[name]()
+    except Exception:
+        current_app.logger.exception(f'Maintenance task {name} failed')
+        return None
+    elapsed = time.perf_counter() - start
+    current_app.logger.info(f'Maintenance task {name} finished in {elapsed:.3f}s')
+    return elapsed
+
+
+class MaintenanceScheduler:
+    """Daily in-process timer for the maintenance tasks.
+
+    Stats refresh and page warm-up run in every process that starts the
+    scheduler, since their results live in process memory. Database
+    optimization only needs one runner, so it is guarded by a lock file in
+    the instance folder and skipped by the other workers.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._thread = None
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.cli.add_command(maintenance_cli)
+        if app.config.get('MAINTENANCE_SCHEDULER_ENABLED'):
+            self.start()
+
+    def jobs(self):
+        config = self.app.config
+        return [
+            (config.get('MAINTENANCE_STATS_TIME', '00:05'), ['stats', 'warm'], False),
+            (config.get('MAINTENANCE_DB_TIME', '04:00'), ['optimize'], True),
+        ]
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='maintenance-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = datetime.now()
+            due_at, tasks, exclusive = min(
+                ((_next_occurrence(now, at), tasks, exclusive) for at, tasks, exclusive in self.jobs()),
+                key=lambda job: job[0])
+            if self._stop.wait((due_at - now).total_seconds()):
+                return
+            with self.app.app_context():
+                if exclusive:
+                    self._run_exclusive(tasks)
+                else:
+                    for name in tasks:
+                        run_task(name)
+
+    def _run_exclusive(self, tasks):
+        if fcntl is None:
+            for name in tasks:
+                run_task(name)
+            return
+        os.makedirs(self.app.instance_path, exist_ok=True)
+        with open(os.path.join(self.app.instance_path, 'maintenance.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            try:
+                for name in tasks:
+                    run_task(name)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _next_occurrence(now, at):
+    hour, minute = (int(part) for part in at.split(':'))
+    due_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if due_at <= now:
+        due_at += timedelta(days=1)
+    return due_at
+
+
+@click.group('maintenance')
+def maintenance_cli():
+    """Database and cache maintenance tasks."""
+
+
+@maintenance_cli.command('run')
+@click.argument('tasks', nargs=-1, type=click.Choice(sorted(TASKS)))
+@with_appcontext
+def run_command(tasks):
+    """Run maintenance TASKS now (all of them when none are given).
+
+    The stats and warm tasks fill in-process caches, so run from the CLI
+    they only time the work; server workers fill their own when they start.
+    """
+    failed = []
+    for name in tasks or TASKS:
+        elapsed = run_task(name)
+        if elapsed is None:
+            failed.append(name)
+        else:
+            click.echo(f'{name}: {elapsed:.3f}s')
+    if failed:
+        raise click.ClickException(f'Failed tasks: {", ".join(failed)}')
@@ -0,0 +1,483 @@
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key):
+        return tuple(zip(self.labelnames, key))
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super(Counter, self).__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name + '_total', self._labels(key), value) for key, value in items]
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super(Gauge, self).__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, self._labels(key), value) for key, value in items]
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, *args, buckets=DEFAULT_BUCKETS, **kwargs):
+        super(Histogram, self).__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        result = []
+        for key, bucket_counts, total, count in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                result.append((self.name + '_bucket', labels + (('le', _format_value(bound)),), cumulative))
+            result.append((self.name + '_bucket', labels + (('le', '+Inf'),), count))
+            result.append((self.name + '_sum', labels, total))
+            result.append((self.name + '_count', labels, count))
+        return result
+
+
+class Registry:
+    """Process-local metric registry.
+
+    Every metric guards its own samples with a plain lock, so recording is a
+    dict update. When ``multiproc_dir`` is set a daemon thread in each
+    process writes its samples every ``flush_interval`` seconds, whether or
+    not more requests arrive, to ``<multiproc_dir>/<pid>-<start ns>.json``
+    and a scrape merges the files of every worker: counters and histograms are
+    summed over all files, gauges only over processes that are still alive.
+    A scrape also folds the counters and histograms of exited processes into
+    ``aggregate.json`` and deletes their files, so recycled workers neither
+    grow the directory nor make the totals go down.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self.multiproc_dir = None
+        self.flush_interval = 1.0
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._file_name = None
+        self._last_written = None
+        self._flusher = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # A forked worker starts from zero under its own file; otherwise it
+        # would report the samples it inherited from the master again.
+        self._file_name = None
+        self._last_written = None
+        self._flusher = None
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+        for metric in self._metrics:
+            metric._reset()
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return Counter(self, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return Gauge(self, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return Histogram(self, name, documentation, labelnames, buckets=buckets)
+
+    def _local_samples(self):
+        return {metric.name: metric.samples() for metric in self._metrics}
+
+    def start_flusher(self):
+        """Start this process's flush thread unless it is already running."""
+        if not self.multiproc_dir or (self._flusher is not None and self._flusher.is_alive()):
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while self.multiproc_dir:
+            time.sleep(self.flush_interval)
+            self.maybe_flush(force=True)
+
+    def maybe_flush(self, force=False):
+        if not self.multiproc_dir:
+            return
+        self.start_flusher()
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        if not self._flush_lock.acquire(blocking=force):
+            return
+        try:
+            self._last_flush = now
+            data = json.dumps(self._local_samples())
+            if data == self._last_written:
+                return
+            if self._file_name is None:
+                self._file_name = f'{os.getpid()}-{time.time_ns()}.json'
+            path = os.path.join(self.multiproc_dir, self._file_name)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._last_written = data
+        finally:
+            self._flush_lock.release()
+
+    def _process_files(self):
+        """Return ``(live, dead)`` lists of per-process sample file names.
+
+        A pid reused by the OS has a newer file than the process that died
+        under it, so only the newest file of a running pid counts as live.
+        """
+        newest = {}
+        files = []
+        for filename in os.listdir(self.multiproc_dir):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                pid, started = (int(part) for part in filename[:-5].split('-'))
+            except ValueError:
+                continue
+            files.append((filename, pid, started))
+            newest[pid] = max(newest.get(pid, started), started)
+        live, dead = [], []
+        for filename, pid, started in files:
+            if started == newest[pid] and _pid_alive(pid):
+                live.append(filename)
+            else:
+                dead.append(filename)
+        return live, dead
+
+    def _read(self, filename):
+        try:
+            with open(os.path.join(self.multiproc_dir, filename)) as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return None
+
+    def _compact(self, dead, gauges):
+        """Fold the counters and histograms of exited processes into the aggregate file."""
+        aggregate_path = os.path.join(self.multiproc_dir, 'aggregate.json')
+        with open(os.path.join(self.multiproc_dir, 'aggregate.lock'), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            aggregate = self._read('aggregate.json') or {'folded': [], 'samples': {}}
+            # Names are kept until their file is gone, so a scrape that dies
+            # between writing the aggregate and unlinking never folds twice.
+            folded = {name for name in aggregate['folded']
+                      if os.path.exists(os.path.join(self.multiproc_dir, name))}
+            merged = {name: _sample_map(samples) for name, samples in aggregate['samples'].items()}
+            for filename in dead:
+                if filename in folded:
+                    continue
+                data = self._read(filename)
+                if data is None:
+                    continue
+                _merge(merged, data, skip=gauges)
+                folded.add(filename)
+            aggregate = {'folded': sorted(folded), 'samples': _sample_lists(merged)}
+            tmp_path = f'{aggregate_path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(aggregate, f)
+            os.replace(tmp_path, aggregate_path)
+            for filename in dead:
+                try:
+                    os.remove(os.path.join(self.multiproc_dir, filename))
+                except OSError:
+                    pass
+            return aggregate
+
+    def _collect(self):
+        if not self.multiproc_dir:
+            return self._local_samples()
+
+        self.maybe_flush(force=True)
+        gauges = {metric.name for metric in self._metrics if metric.type_name == 'gauge'}
+        live, dead = self._process_files()
+        if dead:
+            aggregate = self._compact(dead, gauges)
+        else:
+            aggregate = self._read('aggregate.json') or {'samples': {}}
+        merged = {name: _sample_map(samples) for name, samples in aggregate['samples'].items()}
+        for filename in live:
+            data = self._read(filename)
+            if data is not None:
+                _merge(merged, data)
+        return _sample_lists(merged)
+
+    def generate_latest(self):
+        collected = self._collect()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            for sample_name, labels, value in collected.get(metric.name, []):
+                if labels:
+                    label_str = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+                    lines.append(f'{sample_name}{{{label_str}}} {_format_value(value)}')
+                else:
+                    lines.append(f'{sample_name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _sample_map(samples):
+    return {(sample_name, tuple(tuple(pair) for pair in labels)): value
+            for sample_name, labels, value in samples}
+
+
+def _sample_lists(merged):
+    return {name: [(sample_name, labels, value) for (sample_name, labels), value in samples.items()]
+            for name, samples in merged.items()}
+
+
+def _merge(merged, data, skip=()):
+    for name, samples in data.items():
+        if name in skip:
+            continue
+        target = merged.setdefault(name, {})
+        for sample_name, labels, value in samples:
+            key = (sample_name, tuple(tuple(pair) for pair in labels))
+            target[key] = target.get(key, 0.0) + value
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    value = float(value)
+    if value == float('inf'):
+        return '+Inf'
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    'magallanes_http_request_duration_seconds',
+    'HTTP request latency by blueprint and endpoint.',
+    ('blueprint', 'endpoint'))
+REQUESTS_IN_FLIGHT = registry.gauge(
+    'magallanes_http_requests_in_flight',
+    'HTTP requests currently being served.')
+RESPONSES = registry.counter(
+    'magallanes_http_responses',
+    'HTTP responses by method and status code.',
+    ('method', 'status'))
+DB_POOL_CHECKOUTS = registry.counter(
+    'magallanes_db_pool_checkouts',
+    'Connections checked out of the SQLAlchemy pool.')
+DB_POOL_CHECKED_OUT = registry.gauge(
+    'magallanes_db_pool_checked_out',
+    'Connections currently checked out of the SQLAlchemy pool.')
+DB_POOL_OVERFLOW = registry.gauge(
+    'magallanes_db_pool_overflow',
+    'Connections open beyond the configured pool size.')
+DB_POOL_WAIT = registry.histogram(
+    'magallanes_db_pool_wait_seconds',
+    'Time spent waiting for a pooled connection.',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+DB_STATEMENTS = registry.counter(
+    'magallanes_db_statements',
+    'SQL statements executed by statement type.',
+    ('operation',))
+ROSTER_IMPORT_ROWS = registry.counter(
+    'magallanes_roster_import_rows',
+    'CSV roster rows processed by outcome.',
+    ('result',))
+ROSTER_IMPORT_DURATION = registry.histogram(
+    'magallanes_roster_import_duration_seconds',
+    'Time spent processing a roster CSV import.')
+
+
+def _statement_operation(statement):
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    if operation in ('SELECT', 'INSERT', 'UPDATE', 'DELETE'):
+        return operation
+    return 'OTHER'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    DB_STATEMENTS.inc(operation=_statement_operation(statement))
+
+
+def _instrument_engine(engine):
+    if getattr(engine, '_metrics_instrumented', False):
+        return
+    raw_connection = engine.raw_connection
+
+    # dispose() replaces engine.pool, so the gauges read it at call time
+    def update_gauges():
+        pool = engine.pool
+        if hasattr(pool, 'checkedout'):
+            DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        if hasattr(pool, 'overflow'):
+            DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc()
+        update_gauges()
+
+    def on_checkin(dbapi_connection, connection_record):
+        update_gauges()
+
+    # The pool has no "before checkout" event, so the wait is timed around
+    # the call the engine makes to obtain a connection. Wrapping the engine
+    # rather than the pool keeps the timer across dispose(); the pool event
+    # listeners are carried over to the replacement pool by SQLAlchemy.
+    def timed_raw_connection():
+        start = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+    event.listen(engine, 'checkout', on_checkout)
+    event.listen(engine, 'checkin', on_checkin)
+    engine.raw_connection = timed_raw_connection
+    engine._metrics_instrumented = True
+
+
+class Metrics:
+    def __init__(self, app=None):
+        self.registry = registry
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+
+        multiproc_dir = app.config.get('METRICS_MULTIPROC_DIR')
+        if multiproc_dir:
+            os.makedirs(multiproc_dir, exist_ok=True)
+            self.registry.multiproc_dir = multiproc_dir
+            self.registry.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 1.0)
+
+        from app import db
+        with app.app_context():
+            for engine in db.engines.values():
+                _instrument_engine(engine)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    def _after_request(self, response):
+        start = g.get('_metrics_start')
+        if start is not None:
+            REQUEST_LATENCY.observe(time.perf_counter() - start,
+                                    blueprint=request.blueprint or '',
+                                    endpoint=request.endpoint or 'none')
+        RESPONSES.inc(method=request.method, status=response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        if g.pop('_metrics_start', None) is not None:
+            REQUESTS_IN_FLIGHT.dec()
+        self.registry.maybe_flush()
+
+    def generate_latest(self):
+        return self.registry.generate_latest()
@@ -0,0 +1,184 @@
+import io
+import re
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import event, inspect
+
+PlanCase = namedtuple('PlanCase', 'name method path data allow_scan allow_sort')
+Violation = namedtuple('Violation', 'case statement detail')
+
+SEED_PASSWORD = 'query-plans'
+# Lookup tables small enough that reading them whole is never a regression
+SMALL_TABLES = {'roles', 'birthplaces'}
+
+# Every route in the roster, admin and auth blueprints that reads or writes
+# the database, in the order a session would reach them. Forms are posted with
+# valid data so the write paths run too; ``check`` fails a POST that does not
+# redirect, since that means the form was rejected before any write.
+# ``allow_scan`` lists tables a case may read in full on purpose,
+# ``allow_sort`` whether a temp B-tree is accepted (free-text OR search cannot
+# be ordered by an index).
+CASES = [
+    PlanCase('auth.login', 'POST', '/auth/login',
+             {'username': 'admin', 'password': SEED_PASSWORD}, (), False),
+    PlanCase('roster.index', 'GET', '/roster/', None, (), False),
+    PlanCase('roster.teams', 'GET', '/roster/teams', None, (), False),
+    PlanCase('roster.teams page 2', 'GET', '/roster/teams?page=2', None, (), False),
+    PlanCase('roster.team_detail', 'GET', '/roster/team/1', None, (), False),
+    PlanCase('roster.birthplaces', 'GET', '/roster/birthplaces', None, (), False),
+    PlanCase('roster.create_team', 'GET', '/roster/team/create', None, (), False),
+    PlanCase('roster.create_team post', 'POST', '/roster/team/create',
+             {'name': 'Plan Team', 'league': 'LVBP', 'city': 'Plan City', 'founded_year': '1957'},
+             (), False),
+    PlanCase('roster.add_player', 'GET', '/roster/team/1/add_player', None, (), False),
+    # A new birthplace, so both the lookup and the insert of the dimension run
+    PlanCase('roster.add_player post', 'POST', '/roster/team/1/add_player',
+             {'name': 'Plan Player', 'date_of_birth': '1998-05-17', 'general_position': 'RHP',
+              'specific_position': 'SP', 'jersey_number': '77', 'birthplace_city': 'Plan City',
+              'birthplace_state': 'ZUL', 'bats': 'RIGHT', 'throws': 'RIGHT',
+              'contract_status': 'Active'},
+             (), False),
+    # The duplicate finder and the import build the trigram index from every player
+    PlanCase('roster.duplicates', 'GET', '/roster/duplicates', None, ('players',), False),
+    PlanCase('roster.import_players', 'POST', '/roster/team/2/import_players',
+             lambda: {'csv_file': (io.BytesIO(
+                 b'Player name,General Position,DOB,Birthplace\n'
+                 b'Imported Player One,INFIELDER,01/02/1999,Valencia - CAR\n'
+                 b'Imported Player Two,RHP,03/04/2000,Maracaibo - ZUL\n'), 'players.csv')},
+             ('players',), False),
+    PlanCase('roster.transfer_players', 'GET', '/roster/team/3/transfer', None, (), False),
+    PlanCase('roster.transfer_players post', 'POST', '/roster/team/3/transfer',
+             {'target_team': '4', 'jersey_policy': 'next_free', 'player_ids': ['81', '82', '83']},
+             (), False),
+    PlanCase('admin.index', 'GET', '/admin/', None, (), False),
+    PlanCase('admin.users', 'GET', '/admin/users', None, (), False),
+    PlanCase('admin.users page 3', 'GET', '/admin/users?page=3', None, (), False),
+    PlanCase('admin.users status', 'GET', '/admin/users?status=pending', None, (), False),
+    PlanCase('admin.users inactive', 'GET', '/admin/users?status=inactive', None, (), False),
+    PlanCase('admin.users role', 'GET', '/admin/users?role=1', None, (), False),
+    PlanCase('admin.users department', 'GET', '/admin/users?department=Scouting', None, (), False),
+    PlanCase('admin.users search', 'GET', '/admin/users?q=user1', None, (), True),
+    PlanCase('admin.bulk_users', 'POST', '/admin/users/bulk',
+             {'action': 'approve', 'user_ids': ['3', '4', '5']}, (), False),
+    PlanCase('admin.edit_user', 'GET', '/admin/user/3/edit', None, (), False),
+    PlanCase('admin.edit_user post', 'POST', '/admin/user/3/edit',
+             {'username': 'user1-renamed', 'email': 'user1.renamed@example.com',
+              'first_name': 'First1', 'last_name': 'Renamed', 'department': 'Analytics',
+              'role': '1'},
+             (), False),
+    PlanCase('admin.create_user', 'GET', '/admin/user/create', None, (), False),
+    PlanCase('admin.create_user post', 'POST', '/admin/user/create',
+             {'username': 'planuser', 'email': 'planuser@example.com', 'password': 'plan-password',
+              'first_name': 'Plan', 'last_name': 'User', 'department': 'Scouting', 'role': '1'},
+             (), False),
+    PlanCase('auth.logout', 'GET', '/auth/logout', None, (), False),
+]
+
+DEPARTMENTS = ['Scouting', 'Analytics', 'Coaching', 'Medical', 'Front Office']
+POSITIONS = ['CATCHER', 'INFIELDER', 'OUTFIELDER', 'RHP', 'LHP']
+
+
+def seed(db, teams=30, players_per_team=40, users=600):
+    """Fill an empty schema with enough rows for the planner to prefer indexes."""
+    from app.models.user import User, Role
+    from app.models.roster import Team, Player
+
+    Role.insert_roles()
+    roles = Role.query.order_by(Role.id).all()
+    admin_role = next(role for role in roles if role.name == 'Admin')
+    now = datetime.now(timezone.utc)
+
+    admin = User(username='admin', email='admin@example.com', first_name='Admin',
+                 last_name='Magallanes', role=admin_role, status='approved', active=True,
+                 created_at=now - timedelta(days=365))
+    admin.set_password(SEED_PASSWORD)
+    db.session.add(admin)
+    for i in range(users):
+        db.session.add(User(
+            username=f'user{i}', email=f'user{i}@example.com',
+            first_name=f'First{i}', last_name=f'Last{i}',
+            department=DEPARTMENTS[i % len(DEPARTMENTS)],
+            role=roles[i % len(roles)],
+            status='pending' if i % 7 == 0 else 'approved',
+            active=i % 11 != 0,
+            created_at=now - timedelta(hours=i),
+            password_hash='-'))
+
+    for t in range(teams):
+        team = Team(name=f'Team {t:02d}', league='LVBP', city=f'City {t}', created_by=admin)
+        db.session.add(team)
+        for p in range(players_per_team):
+            n = t * players_per_team + p
+            player = Player(
+                name=f'Player {n} Surname{n % 97}', player_slug=f'player-{n}', team=team,
+                jersey_number=p + 1, general_position=POSITIONS[p % len(POSITIONS)],
+                date_of_birth=date(1990 + n % 12, 1 + n % 12, 1 + n % 28),
+                created_at=now - timedelta(minutes=n))
+            player.set_birthplace_from_string(f'City {n % 40} - ST{n % 9}')
+            db.session.add(player)
+    db.session.commit()
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('ANALYZE')
+
+
+def capture_statements(engine):
+    """Collect (statement, parameters) for every query on ``engine``.
+
+    An executemany is explained once, with its first parameter set.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def explain(connection, statement, parameters):
+    cursor = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+    return [row[-1] for row in cursor]
+
+
+def violations(case, plan, tables):
+    for detail in plan:
+        scan = re.match(r'SCAN (\w+)$', detail)
+        if scan and scan.group(1) in tables - SMALL_TABLES and scan.group(1) not in case.allow_scan:
+            yield detail
+        elif detail.startswith('USE TEMP B-TREE') and not case.allow_sort:
+            yield detail
+
+
+def check(app, db, cases=CASES, report=print):
+    """Drive ``cases`` through the test client and EXPLAIN what they run.
+
+    Returns the list of violations: bare table scans (index-ordered and
+    covering-index scans are fine) and temp B-tree sorts on hot paths.
+    """
+    found = []
+    with app.app_context():
+        tables = set(inspect(db.engine).get_table_names())
+        statements = capture_statements(db.engine)
+        client = app.test_client()
+        for case in cases:
+            del statements[:]
+            data = case.data() if callable(case.data) else case.data
+            response = client.open(case.path, method=case.method, data=data)
+            if response.status_code >= 400:
+                raise RuntimeError(f'{case.name}: {case.method} {case.path} returned {response.status_code}')
+            if case.method == 'POST' and response.status_code != 302:
+                raise RuntimeError(f'{case.name}: {case.method} {case.path} did not redirect, '
+                                   f'so the form was rejected')
+            seen = set()
+            with db.engine.connect() as connection:
+                for statement, parameters in statements:
+                    if statement in seen:
+                        continue
+                    seen.add(statement)
+                    plan = explain(connection, statement, parameters)
+                    bad = list(violations(case, plan, tables))
+                    report(f'{"FAIL" if bad else "ok  "} {case.name}: {" | ".join(plan)}')
+                    found.extend(Violation(case.name, statement, detail) for detail in bad)
+    return found
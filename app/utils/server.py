@@ -0,0 +1,258 @@
+import logging
+import os
+import random
+import select
+import selectors
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+logger = logging.getLogger('magallanes.server')
+
+LISTEN_FD_ENV = 'MAGALLANES_LISTEN_FD'
+OLD_WORKERS_ENV = 'MAGALLANES_OLD_WORKERS'
+STARTED_AT_ENV = 'MAGALLANES_STARTED_AT'
+
+
+def preload_app():
+    """Create the app once in the master so workers share it copy-on-write.
+
+    Mapper configuration, template compilation and SQL statement compilation
+    are done here; the database pool is disposed afterwards so no connection
+    is inherited across fork().
+    """
+    from sqlalchemy.orm import configure_mappers
+    from app import create_app, db, maintenance
+    from app.models.user import User, Role
+    from app.models.roster import Team, Player
+
+    app = create_app()
+    # The scheduler thread would not survive fork(); workers start their own
+    maintenance.stop()
+    configure_mappers()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    with app.app_context():
+        Role.query.all()
+        User.query.count()
+        Team.query.count()
+        Player.query.count()
+        db.engine.dispose()
+    return app
+
+
+def warm_worker(app):
+    from app import db
+    from app.models.user import Role
+    from app.utils.maintenance import refresh_daily_stats
+
+    with app.app_context():
+        # Drop the pool inherited from the master without closing its
+        # connections, then open this worker's own.
+        db.engine.dispose(close=False)
+        Role.query.all()
+        # Workers forked after the nightly refresh would otherwise start
+        # with an empty average-age cache.
+        refresh_daily_stats()
+
+
+class PreforkServer:
+    """Minimal pre-fork WSGI server built on Werkzeug's single-request server.
+
+    The master binds the socket, preloads the app and forks ``workers``
+    processes that accept on the shared socket. Workers exit after
+    ``max_requests`` (plus jitter) requests and are replaced. SIGHUP
+    re-executes the master with the listening socket inherited: the new
+    image preloads fresh code, starts and warms a new set of workers and only
+    then stops the old ones, so the socket never stops accepting.
+    SIGTERM/SIGINT stop gracefully.
+    """
+
+    def __init__(self, app_factory, host='0.0.0.0', port=8000, workers=2, max_requests=1000,
+                 max_requests_jitter=50, graceful_timeout=30):
+        self.app_factory = app_factory
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.started_at = float(os.environ.pop(STARTED_AT_ENV, time.time()))
+        self.workers = {}
+        self.app = None
+        self.sock = None
+        self._ready_r = self._ready_w = None
+        self._stopping = False
+        self._reload = False
+
+    def run(self):
+        signal.signal(signal.SIGHUP, self._on_hup)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        self.sock = self._listen()
+        preload_start = time.time()
+        self.app = self.app_factory()
+        logger.info(f'Preloaded app in {time.time() - preload_start:.3f}s')
+
+        old_workers = [int(pid) for pid in os.environ.pop(OLD_WORKERS_ENV, '').split(',') if pid]
+        self._ready_r, self._ready_w = os.pipe()
+
+        for _ in range(self.worker_count):
+            self._spawn()
+        self._wait_ready(self.worker_count)
+        logger.info(f'{self.worker_count} workers ready on {self.host}:{self.port}, '
+                    f'{time.time() - self.started_at:.3f}s after start')
+        if old_workers:
+            self._stop_workers(old_workers)
+
+        while not self._stopping and not self._reload:
+            self._reap()
+            for _ in range(self.worker_count - len(self.workers)):
+                self._spawn()
+            time.sleep(0.5)
+
+        if self._reload:
+            self._exec_reload()
+        self._stop_workers(list(self.workers))
+
+    def _listen(self):
+        fd = os.environ.pop(LISTEN_FD_ENV, None)
+        if fd is not None:
+            sock = socket.socket(fileno=int(fd))
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((self.host, self.port))
+            sock.listen(128)
+        sock.set_inheritable(True)
+        # Workers race to accept(); a non-blocking socket lets the losers
+        # return to their loop instead of blocking until the next client.
+        sock.setblocking(False)
+        return sock
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            os.close(self._ready_r)
+            code = 0
+            try:
+                self._worker_main()
+            except Exception:
+                logger.exception('Worker crashed')
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = time.time()
+        return pid
+
+    def _wait_ready(self, count):
+        deadline = time.time() + self.graceful_timeout
+        ready = 0
+        while ready < count and time.time() < deadline:
+            readable, _, _ = select.select([self._ready_r], [], [], max(deadline - time.time(), 0))
+            if readable:
+                ready += len(os.read(self._ready_r, count - ready))
+        if ready < count:
+            logger.warning(f'Only {ready} of {count} workers reported ready')
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.workers.pop(pid, None) is not None and not self._stopping:
+                logger.info(f'Worker {pid} exited ({os.waitstatus_to_exitcode(status)}), replacing')
+
+    def _stop_workers(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.time() + self.graceful_timeout
+        remaining = set(pids)
+        while remaining and time.time() < deadline:
+            for pid in list(remaining):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    remaining.discard(pid)
+                    self.workers.pop(pid, None)
+            time.sleep(0.1)
+        for pid in remaining:
+            logger.warning(f'Worker {pid} did not stop in time, killing it')
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+
+    def _exec_reload(self):
+        logger.info('Reloading: re-executing master with the listening socket')
+        os.environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        os.environ[OLD_WORKERS_ENV] = ','.join(str(pid) for pid in self.workers)
+        os.environ[STARTED_AT_ENV] = str(time.time())
+        os.set_inheritable(self.sock.fileno(), True)
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    def _on_hup(self, signum, frame):
+        self._reload = True
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _worker_main(self):
+        running = [True]
+
+        def stop(signum, frame):
+            running[0] = False
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        random.seed()
+
+        spawned_at = time.time()
+        warm_worker(self.app)
+        from app import metrics
+        metrics.registry.start_flusher()
+        if self.app.config.get('MAINTENANCE_SCHEDULER_ENABLED'):
+            from app import maintenance
+            maintenance.start()
+
+        limit = self.max_requests + random.randint(0, self.max_requests_jitter)
+        served = [0]
+        started_at = self.started_at
+        app = self.app
+
+        def counting_app(environ, start_response):
+            served[0] += 1
+            if served[0] == 1:
+                now = time.time()
+                logger.info(f'Worker {os.getpid()} served its first request {now - spawned_at:.3f}s '
+                            f'after fork ({now - started_at:.3f}s after master start)')
+            return app(environ, start_response)
+
+        server = make_server(self.host, self.port, counting_app, fd=self.sock.fileno())
+        server.socket.setblocking(False)
+        os.write(self._ready_w, b'1')
+        logger.info(f'Worker {os.getpid()} warmed up in {time.time() - spawned_at:.3f}s')
+
+        # handle_request() derives its wait from the socket timeout, which is
+        # zero for a non-blocking socket, so the wait is done here instead.
+        with selectors.DefaultSelector() as selector:
+            selector.register(server.socket, selectors.EVENT_READ)
+            while running[0] and (not self.max_requests or served[0] < limit):
+                if selector.select(1.0):
+                    server._handle_request_noblock()
+        server.server_close()
+
+        metrics.registry.maybe_flush(force=True)
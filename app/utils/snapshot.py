@@ -0,0 +1,376 @@
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import date, datetime, timezone
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+MAGIC = b'MAGSNAP\0'
+VERSION = 2
+# magic, version, byte order, team count, player count, recent count,
+# string count, build time
+HEADER = struct.Struct('<8sHH4Id')
+NULL_INT = -2 ** 31
+NULL_STR = 2 ** 32 - 1
+RECENT_PLAYERS = 20
+
+# Column kinds: 'i' int32, 's' uint32 string-table index, 'd' float64,
+# 'date' int32 proleptic ordinal, 'ts' float64 UTC timestamp.
+TEAM_COLUMNS = (
+    ('id', 'i'), ('name', 's'), ('league', 's'), ('division', 's'),
+    ('city', 's'), ('state', 's'), ('country', 's'), ('manager', 's'),
+    ('home_stadium', 's'), ('founded_year', 'i'), ('updated_at', 'ts'),
+)
+PLAYER_COLUMNS = (
+    ('id', 'i'), ('team_id', 'i'), ('name', 's'), ('player_slug', 's'),
+    ('jersey_number', 'i'), ('date_of_birth', 'date'),
+    ('general_position', 's'), ('specific_position', 's'),
+    ('birthplace_city', 's'), ('birthplace_state', 's'), ('birthplace_full', 's'),
+    ('height', 's'), ('weight', 'i'), ('bats', 's'), ('throws', 's'),
+    ('current_league', 's'), ('current_team_external', 's'),
+    ('contract_status', 's'), ('notes', 's'), ('depth_order', 'i'),
+    ('created_at', 'ts'), ('updated_at', 'ts'),
+)
+TYPECODES = {'i': 'i', 's': 'I', 'd': 'd', 'date': 'i', 'ts': 'd'}
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _encode(kind, value, strings):
+    if kind == 's':
+        if value is None:
+            return NULL_STR
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+    if kind == 'i':
+        return NULL_INT if value is None else int(value)
+    if kind == 'date':
+        return NULL_INT if value is None else value.toordinal()
+    if kind == 'ts':
+        if value is None:
+            return math.nan
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return math.nan if value is None else float(value)
+
+
+def build_snapshot(connection, path):
+    """Serialize every team and player into a snapshot file at ``path``.
+
+    Teams are stored in name order and players grouped by team in id order,
+    so each team's roster is a contiguous ``(start, count)`` slice of the
+    player columns. The file is written next to ``path`` and renamed into
+    place, so readers never see a partial snapshot.
+    """
+    from app.models.roster import Team, Player
+
+    team_rows = connection.execute(
+        select(*(Team.__table__.c[name] for name, _ in TEAM_COLUMNS)).order_by(Team.name, Team.id)
+    ).all()
+    team_position = {row.id: i for i, row in enumerate(team_rows)}
+    player_rows = sorted(
+        connection.execute(select(*(Player.__table__.c[name] for name, _ in PLAYER_COLUMNS))).all(),
+        key=lambda row: (team_position.get(row.team_id, len(team_rows)), row.id))
+    player_rows = [row for row in player_rows if row.team_id in team_position]
+
+    strings = {}
+    team_columns = [array(TYPECODES[kind], (_encode(kind, row[i], strings) for row in team_rows))
+                    for i, (name, kind) in enumerate(TEAM_COLUMNS)]
+    player_columns = [array(TYPECODES[kind], (_encode(kind, row[i], strings) for row in player_rows))
+                      for i, (name, kind) in enumerate(PLAYER_COLUMNS)]
+
+    starts = array('I', [0] * len(team_rows))
+    counts = array('I', [0] * len(team_rows))
+    for i, row in enumerate(player_rows):
+        position = team_position[row.team_id]
+        if counts[position] == 0:
+            starts[position] = i
+        counts[position] += 1
+
+    created = player_columns[[name for name, _ in PLAYER_COLUMNS].index('created_at')]
+    recent = array('I', sorted((i for i in range(len(player_rows)) if not math.isnan(created[i])),
+                               key=lambda i: created[i], reverse=True)[:RECENT_PLAYERS])
+
+    blobs = [value.encode('utf-8') for value in strings]
+    string_offsets = array('I', [0])
+    for blob in blobs:
+        string_offsets.append(string_offsets[-1] + len(blob))
+
+    sections = team_columns + [starts, counts] + player_columns + [recent, string_offsets]
+    header = HEADER.pack(MAGIC, VERSION, 0 if sys.byteorder == 'little' else 1,
+                         len(team_rows), len(player_rows), len(recent), len(blobs), time.time())
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for section in sections:
+            f.write(b'\0' * (_align(f.tell()) - f.tell()))
+            section.tofile(f)
+        f.write(b''.join(blobs))
+    os.replace(tmp_path, path)
+    return len(team_rows), len(player_rows)
+
+
+class _Column:
+    def __init__(self, kind, index):
+        self.kind = kind
+        self.index = index
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = obj._columns[self.index][obj._row]
+        kind = self.kind
+        if kind == 's':
+            return None if value == NULL_STR else obj._snapshot.string(value)
+        if kind in ('i', 'date'):
+            if value == NULL_INT:
+                return None
+            return date.fromordinal(value) if kind == 'date' else value
+        if math.isnan(value):
+            return None
+        if kind == 'ts':
+            return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class SnapshotTeam:
+    __slots__ = ('_snapshot', '_columns', '_row')
+
+    def __init__(self, snapshot, row):
+        self._snapshot = snapshot
+        self._columns = snapshot._team_columns
+        self._row = row
+
+    @property
+    def player_count(self):
+        return self._snapshot._counts[self._row]
+
+    @property
+    def players(self):
+        start = self._snapshot._starts[self._row]
+        return [SnapshotPlayer(self._snapshot, i) for i in range(start, start + self.player_count)]
+
+    @property
+    def average_age(self):
+        from app.models.roster import cached_average_age, remember_average_age
+        cached = cached_average_age(self.id, self.updated_at)
+        if cached is not None:
+            return cached[1]
+        ages = [p.age for p in self.players if p.age]
+        value = round(sum(ages) / len(ages), 1) if ages else None
+        remember_average_age(self.id, self.updated_at, value)
+        return value
+
+
+class SnapshotPlayer:
+    __slots__ = ('_snapshot', '_columns', '_row')
+
+    def __init__(self, snapshot, row):
+        self._snapshot = snapshot
+        self._columns = snapshot._player_columns
+        self._row = row
+
+    @property
+    def team(self):
+        return self._snapshot.team(self.team_id)
+
+
+for _index, (_name, _kind) in enumerate(TEAM_COLUMNS):
+    setattr(SnapshotTeam, _name, _Column(_kind, _index))
+for _index, (_name, _kind) in enumerate(PLAYER_COLUMNS):
+    setattr(SnapshotPlayer, _name, _Column(_kind, _index))
+
+
+def _borrow_player_properties():
+    from app.models.roster import Player
+    SnapshotPlayer.age = property(Player.__dict__['age'].fget)
+    SnapshotPlayer.birthplace_display = Player.birthplace_display
+    SnapshotPlayer.position_display = Player.position_display
+
+
+class RosterSnapshot:
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Column arrays are ``memoryview`` casts straight over the mapping, so
+    nothing is copied until a template reads a value; only strings are
+    decoded on access.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        (magic, version, byteorder, n_teams, n_players, n_recent,
+         n_strings, self.built_at) = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} roster snapshot')
+        if byteorder != (0 if sys.byteorder == 'little' else 1):
+            raise ValueError(f'{path} was built on a host with a different byte order')
+
+        offset = HEADER.size
+
+        def section(typecode, length):
+            nonlocal offset
+            offset = _align(offset)
+            size = array(typecode).itemsize * length
+            column = view[offset:offset + size].cast(typecode)
+            offset += size
+            return column
+
+        self._team_columns = [section(TYPECODES[kind], n_teams) for _, kind in TEAM_COLUMNS]
+        self._starts = section('I', n_teams)
+        self._counts = section('I', n_teams)
+        self._player_columns = [section(TYPECODES[kind], n_players) for _, kind in PLAYER_COLUMNS]
+        self._recent = section('I', n_recent)
+        self._string_offsets = section('I', n_strings + 1)
+        self._strings = view[offset:]
+
+        team_ids = self._team_columns[0]
+        self._team_rows = {team_ids[i]: i for i in range(n_teams)}
+        self.team_count = n_teams
+        self.player_count = n_players
+
+    def is_current(self, stat):
+        return (stat.st_ino, stat.st_mtime_ns) == (self._stat.st_ino, self._stat.st_mtime_ns)
+
+    def string(self, index):
+        start = self._string_offsets[index]
+        return str(self._strings[start:self._string_offsets[index + 1]], 'utf-8')
+
+    def teams(self):
+        return [SnapshotTeam(self, i) for i in range(self.team_count)]
+
+    def team(self, team_id):
+        row = self._team_rows.get(team_id)
+        return None if row is None else SnapshotTeam(self, row)
+
+    def recent_players(self, limit=5):
+        return [SnapshotPlayer(self, i) for i in self._recent[:limit]]
+
+
+class RosterSnapshots:
+    """Publishes and serves the memory-mapped roster snapshot.
+
+    Disabled unless ``ROSTER_SNAPSHOT_PATH`` is set. Writer processes
+    (``ROSTER_SNAPSHOT_PUBLISH``) rebuild the file after every commit that
+    touched teams or players, one at a time under a lock file so an older
+    build never replaces a newer one; reader processes (``ROSTER_SNAPSHOT_READ``)
+    re-check the file at most every ``ROSTER_SNAPSHOT_CHECK_INTERVAL``
+    seconds and swap in the new mapping when it has been replaced.
+    """
+
+    def __init__(self, app=None):
+        self.path = None
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.cli.add_command(snapshot_cli)
+        self.path = app.config.get('ROSTER_SNAPSHOT_PATH')
+        if not self.path:
+            return
+        self.read = app.config.get('ROSTER_SNAPSHOT_READ', True)
+        self.check_interval = app.config.get('ROSTER_SNAPSHOT_CHECK_INTERVAL', 1.0)
+        _borrow_player_properties()
+        if app.config.get('ROSTER_SNAPSHOT_PUBLISH', True):
+            event.listen(Session, 'after_flush', _track_roster_changes)
+            event.listen(Session, 'after_commit', self._publish_after_commit)
+            event.listen(Session, 'after_rollback', _clear_roster_changes)
+
+    def publish(self):
+        from app import db
+        # The database is read and the file replaced under one lock, so a
+        # writer that read before another writer's commit cannot rename its
+        # older snapshot over the newer one.
+        with open(f'{self.path}.lock', 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with db.engine.connect() as connection:
+                counts = build_snapshot(connection, self.path)
+        if self.read:
+            self._load()
+        return counts
+
+    def current(self):
+        if not self.path or not self.read:
+            return None
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._load()
+        return self._snapshot
+
+    def _load(self):
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._snapshot = None
+                return
+            if self._snapshot is None or not self._snapshot.is_current(stat):
+                try:
+                    self._snapshot = RosterSnapshot(self.path)
+                except (OSError, ValueError):
+                    current_app.logger.exception('Could not load roster snapshot')
+                    self._snapshot = None
+
+    def _publish_after_commit(self, session):
+        if session.info.pop('roster_changed', False):
+            try:
+                self.publish()
+            except Exception:
+                current_app.logger.exception('Could not publish roster snapshot')
+
+
+def _track_roster_changes(session, flush_context):
+    from app.models.roster import Team, Player
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (Team, Player)):
+            session.info['roster_changed'] = True
+            return
+
+
+def _clear_roster_changes(session):
+    session.info.pop('roster_changed', None)
+
+
+@click.group('snapshot')
+def snapshot_cli():
+    """Roster snapshot commands."""
+
+
+@snapshot_cli.command('build')
+@with_appcontext
+def build_command():
+    """Build and publish the roster snapshot."""
+    from app import roster_snapshots
+    if not roster_snapshots.path:
+        raise click.ClickException('ROSTER_SNAPSHOT_PATH is not configured')
+    start = time.perf_counter()
+    teams, players = roster_snapshots.publish()
+    click.echo(f'Published {teams} teams and {players} players to {roster_snapshots.path} '
+               f'in {time.perf_counter() - start:.3f}s')
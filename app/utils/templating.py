@@ -0,0 +1,89 @@
+import os
+import threading
+from collections import OrderedDict
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+
+class FragmentCacheExtension(Extension):
+    """``{% cache 'name', key, ... %}...{% endcache %}`` template tag.
+
+    The rendered body is stored under the tuple of key expressions, so the
+    keys must capture everything the fragment depends on (typically an id,
+    an ``updated_at`` version and any date-derived value). Fragments must not
+    contain per-user or per-request output such as CSRF tokens.
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super(FragmentCacheExtension, self).__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_cache_support', [nodes.Tuple(args, 'load')]),
+                               [], [], body).set_lineno(lineno)
+
+    def _cache_support(self, key, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        rv = cache.get(key)
+        if rv is None:
+            rv = caller()
+            cache.set(key, rv)
+        return rv
+
+
+class FragmentStore:
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TemplateCache:
+    """Wires a filesystem bytecode cache and the fragment cache into Jinja.
+
+    Compiled templates are written to ``TEMPLATE_BYTECODE_CACHE_DIR`` (the
+    instance folder by default) so restarted workers skip recompilation.
+    """
+
+    def __init__(self, app=None):
+        self.fragments = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cache_dir = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR') or \
+            os.path.join(app.instance_path, 'jinja_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        if app.config.get('FRAGMENT_CACHE_ENABLED', True):
+            self.fragments = FragmentStore(app.config.get('FRAGMENT_CACHE_SIZE', 5000))
+            app.jinja_env.fragment_cache = self.fragments
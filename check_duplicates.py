@@ -0,0 +1,73 @@
+import argparse
+import sys
+from datetime import date
+
+from app.utils.duplicates import TrigramIndex, make_key, score_pair
+
+FIRST_NAMES = ['Jose', 'Luis', 'Carlos', 'Miguel', 'Pedro', 'Jesus', 'Juan', 'Angel']
+LAST_NAMES = ['Rodriguez', 'Hernandez', 'Gonzalez', 'Perez', 'Garcia', 'Martinez']
+
+
+def build(max_postings):
+    """An index where the common name parts are stop-grams."""
+    index = TrigramIndex(max_postings=max_postings)
+    players = []
+    for n in range(max_postings * 4):
+        name = f'{FIRST_NAMES[n % len(FIRST_NAMES)]} {LAST_NAMES[n % len(LAST_NAMES)]} {n}'
+        key = make_key(n, name, date_of_birth=date(1990 + n % 12, 1 + n % 12, 1 + n % 28),
+                       team_id=n % 8)
+        index.add(key)
+        players.append(key)
+    return index, players
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Check duplicate detection on an index larger than its stop-gram limit.')
+    parser.add_argument('--max-postings', type=int, default=50)
+    args = parser.parse_args()
+
+    index, players = build(args.max_postings)
+    stop_grams = sum(1 for postings in index._postings.values() if len(postings) > args.max_postings)
+    failures = []
+
+    # Candidates found through the pruned postings must score exactly like a
+    # comparison against every player.
+    for key in players[::7]:
+        expected = {other.id: score_pair(key, other, index.threshold) for other in players
+                    if other.id != key.id}
+        expected = {pid: match for pid, match in expected.items() if match is not None}
+        found = {match.player.id: match for match in index.matches(key, exclude_id=key.id)}
+        for pid, match in expected.items():
+            if pid not in found:
+                failures.append(f'{key.name!r}: missed {match.player.name!r} ({match.similarity:.2f})')
+            elif found[pid].similarity != match.similarity:
+                failures.append(f'{key.name!r}: {match.player.name!r} scored '
+                                f'{found[pid].similarity:.3f}, expected {match.similarity:.3f}')
+
+    # An exact copy must score 1.0 even though most of its grams are stop-grams.
+    existing = players[3]
+    copy = make_key(None, existing.name, team_id=existing.team_id + 1)
+    matches = index.matches(copy)
+    if not matches or matches[0].player.id != existing.id or matches[0].similarity != 1.0:
+        failures.append(f'{existing.name!r}: exact copy on another team not matched at 1.0')
+
+    # Same-team rejection only for the exact name, and not for a namesake
+    # with a different date of birth.
+    same_team = make_key(None, existing.name, team_id=existing.team_id)
+    if index.same_team_duplicate(same_team) is not existing:
+        failures.append(f'{existing.name!r}: exact same-team copy not rejected')
+    namesake = make_key(None, existing.name, date_of_birth=date(1970, 1, 1), team_id=existing.team_id)
+    if index.same_team_duplicate(namesake) is not None:
+        failures.append(f'{existing.name!r}: namesake with another date of birth rejected')
+    initials = make_key(None, f'{existing.name} J.', team_id=existing.team_id)
+    if index.same_team_duplicate(initials) is not None:
+        failures.append(f'{initials.name!r}: name differing by an initial rejected')
+
+    for failure in failures:
+        print(failure)
+    print(f'{len(players)} players, {stop_grams} stop-grams, {len(failures)} duplicate check failures')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
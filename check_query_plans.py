@@ -0,0 +1,46 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from config import Config
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Fail when a route query needs a full table scan or a temp B-tree sort.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every query plan')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='magallanes-plans-')
+
+    class QueryPlanConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'plans.db')
+        WTF_CSRF_ENABLED = False
+        METRICS_ENABLED = False
+        MAINTENANCE_SCHEDULER_ENABLED = False
+        ROSTER_SNAPSHOT_PATH = None
+        FRAGMENT_CACHE_ENABLED = False
+        TEMPLATE_BYTECODE_CACHE_DIR = os.path.join(workdir, 'jinja_cache')
+
+    from flask_migrate import upgrade
+    from app import create_app, db
+    from app.utils.query_plans import check, seed
+
+    try:
+        app = create_app(QueryPlanConfig)
+        with app.app_context():
+            # The schema comes from the migrations, so a model index that was
+            # never migrated shows up here as a scan.
+            upgrade()
+            seed(db)
+        found = check(app, db, report=print if args.verbose else lambda line: None)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for violation in found:
+        print(f'{violation.case}: {violation.detail}\n    {violation.statement}\n')
+    print(f'{len(found)} query plan regressions')
+    return 1 if found else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
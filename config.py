@@ -9,4 +9,31 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'magallanes.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    ITEMS_PER_PAGE = 20
\ No newline at end of file
+    ITEMS_PER_PAGE = 20
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0))
+    MAINTENANCE_SCHEDULER_ENABLED = os.environ.get('MAINTENANCE_SCHEDULER_ENABLED', '0') == '1'
+    MAINTENANCE_STATS_TIME = os.environ.get('MAINTENANCE_STATS_TIME', '00:05')
+    MAINTENANCE_DB_TIME = os.environ.get('MAINTENANCE_DB_TIME', '04:00')
+    MAINTENANCE_WARM_TEAMS = 10
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 5
+    COMPRESS_CACHE_SIZE = 256
+    ROSTER_SNAPSHOT_PATH = os.environ.get('ROSTER_SNAPSHOT_PATH')
+    ROSTER_SNAPSHOT_READ = os.environ.get('ROSTER_SNAPSHOT_READ', '1') != '0'
+    ROSTER_SNAPSHOT_PUBLISH = os.environ.get('ROSTER_SNAPSHOT_PUBLISH', '1') != '0'
+    ROSTER_SNAPSHOT_CHECK_INTERVAL = 1.0
+    DUPLICATE_NAME_THRESHOLD = 0.75
+    DUPLICATE_MAX_POSTINGS = 500
+    SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+    SERVER_PORT = int(os.environ.get('SERVER_PORT', 8000))
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', os.cpu_count() or 2))
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 1000))
+    SERVER_MAX_REQUESTS_JITTER = int(os.environ.get('SERVER_MAX_REQUESTS_JITTER', 50))
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR')
+    FRAGMENT_CACHE_ENABLED = True
+    FRAGMENT_CACHE_SIZE = 5000
\ No newline at end of file
@@ -2,6 +2,7 @@ from app import create_app, db
 from app.models.user import User, Role
 from app.models.roster import Team, Player
 from datetime import datetime, timezone
+from flask_migrate import stamp
 
 def init_database():
     app = create_app()
@@ -9,6 +10,8 @@ def init_database():
     with app.app_context():
         print('Creating database tables...')
         db.create_all()
+        # create_all builds the latest schema, so record it as migrated
+        stamp()
         
         print('Inserting roles...')
         Role.insert_roles()
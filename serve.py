@@ -0,0 +1,39 @@
+import argparse
+import logging
+import os
+import tempfile
+from config import Config
+
+def main():
+    parser = argparse.ArgumentParser(description='Run Magallanes with a pre-fork worker pool.')
+    parser.add_argument('--host', default=Config.SERVER_HOST)
+    parser.add_argument('--port', type=int, default=Config.SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS)
+    parser.add_argument('--max-requests', type=int, default=Config.SERVER_MAX_REQUESTS,
+                        help='Recycle a worker after this many requests (0 disables)')
+    parser.add_argument('--max-requests-jitter', type=int, default=Config.SERVER_MAX_REQUESTS_JITTER)
+    parser.add_argument('--graceful-timeout', type=int, default=Config.SERVER_GRACEFUL_TIMEOUT)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='[%(asctime)s] %(levelname)s in %(name)s: %(message)s')
+    logging.getLogger('magallanes.server').setLevel(logging.INFO)
+    logging.getLogger('werkzeug').setLevel(logging.INFO)
+
+    # Workers only see their own samples unless they share a metrics directory.
+    # It is fixed per port so relaunches reuse (and compact) the same files.
+    if not os.environ.get('METRICS_MULTIPROC_DIR'):
+        os.environ['METRICS_MULTIPROC_DIR'] = os.path.join(tempfile.gettempdir(),
+                                                           f'magallanes-metrics-{args.port}')
+        Config.METRICS_MULTIPROC_DIR = os.environ['METRICS_MULTIPROC_DIR']
+
+    from app.utils.server import PreforkServer, preload_app
+    PreforkServer(preload_app,
+                  host=args.host,
+                  port=args.port,
+                  workers=args.workers,
+                  max_requests=args.max_requests,
+                  max_requests_jitter=args.max_requests_jitter,
+                  graceful_timeout=args.graceful_timeout).run()
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file